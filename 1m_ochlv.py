@@ -1,33 +1,51 @@
 #!/usr/bin/env python3
 """
 MEXC Futures 1m OHLCV ― 直近 5 本を取得して表示
-依存: pip install requests
+依存: pip install requests orjson numpy pandas
 """
 
-import datetime as dt
+import numpy as np
+import orjson
+import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 SYMBOL   = "SOL_USDT"   # 先物シンボル
 INTERVAL = "Min1"       # 1 分足
 LIMIT    = 5            # 本数
 
+# keep-alive で TCP/TLS を使い回すセッション（ループ呼び出し時にハンドシェイクを省く）
+_SESSION = requests.Session()
+_SESSION.mount(
+    "https://",
+    HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=8,
+        max_retries=Retry(total=2, backoff_factor=0.1),
+    ),
+)
+_SESSION.headers.update({"Accept-Encoding": "gzip", "Connection": "keep-alive"})
+
 url    = f"https://contract.mexc.com/api/v1/contract/kline/{SYMBOL}"
 params = {"interval": INTERVAL, "limit": LIMIT}
 
-r = requests.get(url, params=params, timeout=10)
+r = _SESSION.get(url, params=params, timeout=10)
 print("HTTP", r.status_code)
 print("URL :", r.url)
 print("\n== raw json ==")
 print(r.text[:200] + (" ..." if len(r.text) > 200 else ""))
 
 if r.ok and r.headers.get("Content-Type", "").startswith("application/json"):
-    for ts, o, h, l, c, v in zip(
-        r.json()["data"]["time"],
-        r.json()["data"]["open"],
-        r.json()["data"]["high"],
-        r.json()["data"]["low"],
-        r.json()["data"]["close"],
-        r.json()["data"]["vol"],
-    ):
-        t = dt.datetime.fromtimestamp(ts, tz=dt.timezone.utc)
+    d = orjson.loads(r.content)["data"]
+
+    # 列ごとの配列 (SoA) を一括で ndarray 化
+    ts    = np.asarray(d["time"], dtype=np.int64)
+    ohlcv = np.stack(
+        [np.asarray(d[k], dtype=np.float64) for k in ("open", "high", "low", "close", "vol")],
+        axis=1,
+    )
+    stamps = pd.to_datetime(ts, unit="s", utc=True).strftime("%Y-%m-%d %H:%M:%S%z")
+
+    for t, (o, h, l, c, v) in zip(stamps, ohlcv):
         print(f"{t}  O:{o} H:{h} L:{l} C:{c} V:{v}")
@@ -1,29 +1,91 @@
 #!/usr/bin/env python3
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import time
 import datetime as dt
-import csv
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 import json
 import os
+import threading
+
+import numpy as np
+import orjson
+import pandas as pd
 
 # 設定
 SYMBOL = "SOL_USDT"  # 先物市場のシンボル形式（アンダースコア区切り）
 INTERVAL = "Min1"  # 1分足 (先物市場形式：Min1、Min5、Min15、Min30、Min60、Hour4、Hour8、Day1、Week1、Month1)
 TOTAL_DAYS = 90  # 合計で90日分のデータを取得
 PERIOD_DAYS = 30  # 30日ごとに分けて取得
+BATCH_MS = 24 * 60 * 60 * 1000  # 1 リクエスト 1 日分（1 回の上限 2000 本に収まる）
+MAX_WORKERS = 8  # 同時リクエスト数（実際の送信ペースは下のレート制限で決まる）
+# MEXC 先物 market 系エンドポイントの上限「20 回 / 2 秒」に合わせたトークンバケット
+RATE_LIMIT_PER_SEC = 10
+RATE_LIMIT_BURST = 20
+
+# 1 行 = [timestamp(ms), open, high, low, close, volume]
+EMPTY_KLINES = np.empty((0, 6), dtype=np.float64)
 
 # 指定のパス
 OUTPUT_DIR = Path("C:/Users/Administrator/Desktop/MEXC_WBAR/src/data")
 OUTPUT_FILE = OUTPUT_DIR / "ohlcv_1m.csv"
+META_FILE = OUTPUT_FILE.with_suffix(".meta.json")  # {"source": "mexc", "unit": "ms", "last_ts": ms, "rows": n}
+CSV_COLUMNS = ["timestamp", "open", "high", "low", "close", "volume"]
+# 同じパスへ書く fetch_tv_ohlcv.py とは時刻の単位・列名が違うので、メタに出所を残して区別する
+META_SOURCE = {"source": "mexc", "unit": "ms"}
 
 # MEXC先物APIのエンドポイント
 BASE_URL = "https://contract.mexc.com"
 KLINE_ENDPOINT = f"/api/v1/contract/kline/{SYMBOL}"  # 正確なAPIエンドポイント
 
+# 全バッチで共有するセッション（keep-alive で TCP/TLS ハンドシェイクを使い回す）
+SESSION = requests.Session()
+SESSION.mount(
+    "https://",
+    HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=20,
+        max_retries=Retry(
+            total=5,
+            backoff_factor=0.5,
+            status_forcelist=[429, 500, 502, 503, 504],
+        ),
+    ),
+)
+SESSION.headers.update({"User-Agent": "MEXC_WBAR/fetch_ohlcv", "Accept-Encoding": "gzip"})
+
+
+class TokenBucket:
+    """スレッド間で共有するトークンバケット（rate 回 / 秒、最大 burst 回まで連続送信可）"""
+
+    def __init__(self, rate, burst):
+        self._rate = rate
+        self._capacity = burst
+        self._tokens = float(burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """トークンが 1 つ貯まるまで待って消費する"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self._capacity, self._tokens + (now - self._last) * self._rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self._rate
+            time.sleep(wait)
+
+
+LIMITER = TokenBucket(RATE_LIMIT_PER_SEC, RATE_LIMIT_BURST)
+
 
 def fetch_klines(interval, start=None, end=None):
-    """MEXC先物APIからローソク足データを取得する関数"""
+    """MEXC先物APIからローソク足データを取得する関数（失敗時は None、該当期間に足が無ければ空配列）"""
     url = f"{BASE_URL}{KLINE_ENDPOINT}"
 
     params = {
@@ -40,14 +102,17 @@ def fetch_klines(interval, start=None, end=None):
         print(f"APIリクエスト: {url}")
         print(f"パラメータ: {params}")
 
-        response = requests.get(url, params=params, timeout=10)
+        # 429 時の指数バックオフは SESSION の Retry（Retry-After 準拠）がこの要求単位で行う
+        LIMITER.acquire()
+        response = SESSION.get(url, params=params, timeout=10)
 
         print(f"HTTPステータスコード: {response.status_code}")
-        print(f"レスポンス（先頭100文字）: {response.text[:100] if len(response.text) > 100 else response.text}")
+        # 本文全体を str へデコードせず、先頭だけ表示
+        print(f"レスポンス（先頭100文字）: {response.content[:100].decode('utf-8', 'replace')}")
 
         response.raise_for_status()  # エラーがあれば例外を発生
 
-        data = response.json()
+        data = orjson.loads(response.content)
 
         if data.get("success") and "data" in data:
             # APIレスポンス構造に基づいてデータを抽出
@@ -65,102 +130,126 @@ def fetch_klines(interval, start=None, end=None):
 
             # データがない場合はすぐに戻る
             if len(time_array) == 0:
-                return []
+                return EMPTY_KLINES
 
             # 配列の長さを確認
             min_length = min(len(time_array), len(open_array), len(high_array),
                              len(low_array), len(close_array), len(vol_array))
 
-            result = []
-            for i in range(min_length):
-                kline = [
-                    time_array[i] * 1000,  # 秒→ミリ秒に戻す
-                    float(open_array[i]),
-                    float(high_array[i]),
-                    float(low_array[i]),
-                    float(close_array[i]),
-                    float(vol_array[i])
-                ]
-                result.append(kline)
+            # 列ごとに一括で ndarray 化（行ごとの float() 変換をしない）
+            result = np.empty((min_length, 6), dtype=np.float64)
+            result[:, 0] = np.asarray(time_array[:min_length], dtype=np.int64) * 1000  # 秒→ミリ秒に戻す
+            for col, values in enumerate((open_array, high_array, low_array, close_array, vol_array), 1):
+                result[:, col] = np.asarray(values[:min_length], dtype=np.float64)
 
             return result
         else:
             print(f"APIエラーまたは予期しないレスポンス形式: {data}")
-            return []
+            return None
 
     except Exception as e:
         print(f"例外が発生しました: {e}")
         print(f"レスポンス: {response.text if 'response' in locals() else 'なし'}")
-        return []
-
-
-def fetch_data_in_batches(interval, start_time, end_time, batch_size=2 * 24 * 60 * 60 * 1000):
-    """複数のバッチに分けてデータを取得する関数（2日ごと）"""
-    all_klines = []
-    current_start = start_time
+        return None
 
-    while current_start < end_time:
-        current_end = min(current_start + batch_size, end_time)
 
-        print(
-            f"バッチデータ取得中: {dt.datetime.fromtimestamp(current_start / 1000, dt.UTC)} から {dt.datetime.fromtimestamp(current_end / 1000, dt.UTC)}")
-
-        klines = fetch_klines(interval, current_start, current_end)
-
-        if klines:
-            all_klines.extend(klines)
-            print(f"このバッチで{len(klines)}本のローソク足を取得しました")
-
-            # 次のバッチの開始時間を設定
-            if len(klines) > 0:
-                # 最後のローソク足の時間 + 1分
-                last_timestamp = klines[-1][0]
-                current_start = last_timestamp + 60000  # 1分 = 60000ミリ秒
-            else:
-                # データがない場合は時間枠をスキップ
-                current_start = current_end
-        else:
-            print(f"このバッチでデータを取得できませんでした。次のバッチに進みます。")
+def make_windows(periods, batch_size=BATCH_MS):
+    """期間リストを固定長のリクエスト窓 (start, end) に分割する関数"""
+    windows = []
+    for period_start, period_end in periods:
+        current_start = period_start
+        while current_start < period_end:
+            current_end = min(current_start + batch_size, period_end)
+            windows.append((current_start, current_end))
             current_start = current_end
+    return windows
 
-        # APIレート制限を考慮して少し待機
-        time.sleep(1)
 
-    return all_klines
+def fetch_windows(interval, windows):
+    """
+    各窓を並列に取得する関数（同時接続数は MAX_WORKERS で制限）
 
-
-def fetch_data_by_periods(interval, periods):
-    """複数の期間に分けてデータを取得する関数"""
+    Returns
+    -------
+    (klines, first_failed)
+        取得できた足と、取得に失敗した窓のうち最も古い開始時刻 (ms)。全て成功なら None
+    """
     all_klines = []
+    first_failed = None
+
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        futures = {
+            executor.submit(fetch_klines, interval, start, end): (start, end)
+            for start, end in windows
+        }
+        for future in as_completed(futures):
+            start, end = futures[future]
+            klines = future.result()
+            window = (f"{dt.datetime.fromtimestamp(start / 1000, dt.UTC)} から "
+                      f"{dt.datetime.fromtimestamp(end / 1000, dt.UTC)}")
+            if klines is None:
+                if first_failed is None or start < first_failed:
+                    first_failed = start
+                print(f"{window}: データを取得できませんでした。")
+            elif len(klines):
+                all_klines.append(klines)
+                print(f"{window}: {len(klines)}本のローソク足を取得しました")
+            else:
+                print(f"{window}: この期間のローソク足はありません。")
 
-    for period_start, period_end in periods:
-        print(
-            f"\n期間データ取得中: {dt.datetime.fromtimestamp(period_start / 1000, dt.UTC)} から {dt.datetime.fromtimestamp(period_end / 1000, dt.UTC)}")
+    klines = np.concatenate(all_klines) if all_klines else EMPTY_KLINES
+    return klines, first_failed
 
-        period_klines = fetch_data_in_batches(interval, period_start, period_end)
 
-        if period_klines:
-            all_klines.extend(period_klines)
-            print(f"この期間で{len(period_klines)}本のローソク足を取得しました")
-        else:
-            print(f"この期間でデータを取得できませんでした。")
+def load_cached_state():
+    """保存済み CSV の (最終足時刻 ms, 行数) を返す関数。キャッシュが無ければ None"""
+    if not OUTPUT_FILE.exists():
+        return None
+
+    # 別スクリプトが書いた CSV（列名が違う）は続きとして使わず、全期間を取り直して上書きする
+    with OUTPUT_FILE.open(newline="") as f:
+        header = f.readline().strip().split(",")
+    if header != CSV_COLUMNS:
+        print(f"既存 CSV の形式が異なるため全期間を取得し直します: {OUTPUT_FILE}")
+        return None
 
-        # 期間間で少し待機して、APIレート制限に引っかからないようにする
-        time.sleep(5)
+    # 出所・単位が一致するサイドカーがあれば CSV をパースせずに済む
+    if META_FILE.exists():
+        try:
+            meta = json.loads(META_FILE.read_text())
+            if all(meta.get(k) == v for k, v in META_SOURCE.items()):
+                return int(meta["last_ts"]), int(meta["rows"])
+        except (ValueError, KeyError):
+            pass
 
-    return all_klines
+    df_old = pd.read_csv(OUTPUT_FILE, usecols=["timestamp"], parse_dates=["timestamp"])
+    if df_old.empty:
+        return None
+    return int(df_old["timestamp"].max().timestamp() * 1000), len(df_old)
 
 
 def main():
-    # 現在時刻（ミリ秒）
+    # 現在時刻（ミリ秒）。形成中の足を保存しないよう、確定済みの最後の分境界で切る
     now = int(time.time() * 1000)
-
-    # 期間を設定（現在の日付から逆算して90日分を3つの30日期間に分ける）
-    periods = []
-    for i in range(TOTAL_DAYS // PERIOD_DAYS):
-        period_end = now - (i * PERIOD_DAYS * 24 * 60 * 60 * 1000)
-        period_start = period_end - (PERIOD_DAYS * 24 * 60 * 60 * 1000)
-        periods.append((period_start, period_end))
+    now -= now % 60_000
+
+    cached = load_cached_state()
+    if cached:
+        # 既存 CSV の続きだけを取得する
+        last_ts, cached_rows = cached
+        first_fetch_ts = max(last_ts + 60_000, now - TOTAL_DAYS * 24 * 60 * 60 * 1000)
+        if first_fetch_ts >= now:
+            print(f"キャッシュは最新です: {OUTPUT_FILE}")
+            return
+        periods = [(first_fetch_ts, now)]
+    else:
+        # 期間を設定（現在の日付から逆算して90日分を3つの30日期間に分ける）
+        last_ts, cached_rows = None, 0
+        periods = []
+        for i in range(TOTAL_DAYS // PERIOD_DAYS):
+            period_end = now - (i * PERIOD_DAYS * 24 * 60 * 60 * 1000)
+            period_start = period_end - (PERIOD_DAYS * 24 * 60 * 60 * 1000)
+            periods.append((period_start, period_end))
 
     # 各期間の詳細を表示
     print("取得予定の期間:")
@@ -169,12 +258,37 @@ def main():
         end_date = dt.datetime.fromtimestamp(end / 1000, dt.UTC)
         print(f"期間{i + 1}: {start_date} から {end_date}")
 
-    # 複数の期間でデータを取得
-    klines = fetch_data_by_periods(INTERVAL, periods)
-
-    if klines:
-        # 時間順にソート
-        klines.sort(key=lambda x: x[0])
+    # 全期間の窓をまとめて並列取得
+    klines, first_failed = fetch_windows(INTERVAL, make_windows(periods))
+
+    # 保存するのは確定済みの足 (now より前) だけ
+    cutoff = now
+    if first_failed is not None:
+        # 欠損窓より後まで保存すると、次回以降は last_ts より後しか取らないので穴が埋まらない。
+        # 最初の欠損窓の手前までだけ保存し、残りは次回の実行で取り直す
+        cutoff = first_failed
+        print(f"取得に失敗した窓があります。"
+              f"{dt.datetime.fromtimestamp(first_failed / 1000, dt.UTC)} 以降は次回取得し直します")
+
+    if len(klines):
+        # 時間順にソートし、隣接する窓の境界で重複した足を除く
+        klines = klines[np.argsort(klines[:, 0], kind="stable")]
+        keep = np.ones(len(klines), dtype=bool)
+        keep[1:] = klines[1:, 0] != klines[:-1, 0]
+        klines = klines[keep]
+
+        # end を含めて返る形成中の足（now 以降）と欠損窓以降の足は捨てる。次回の実行で取り直す
+        klines = klines[klines[:, 0] < cutoff]
+        if not len(klines):
+            print("保存できる確定済みのローソク足がありません")
+            return
+
+        if last_ts is not None:
+            # キャッシュ済みの足は書き直さない
+            klines = klines[klines[:, 0] > last_ts]
+            if not len(klines):
+                print(f"新しいローソク足はありません: {OUTPUT_FILE}")
+                return
 
         print(f"合計：{len(klines)}本のローソク足を取得しました")
 
@@ -194,21 +308,19 @@ def main():
         # ディレクトリが存在しない場合は作成
         OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
-        # データをCSVに保存
-        with OUTPUT_FILE.open("w", newline="") as f:
-            writer = csv.writer(f)
-            writer.writerow(["timestamp", "open", "high", "low", "close", "volume"])
-
-            for kline in klines:
-                timestamp = kline[0]
-                dt_obj = dt.datetime.fromtimestamp(timestamp / 1000, dt.UTC)
-                open_price = kline[1]
-                high_price = kline[2]
-                low_price = kline[3]
-                close_price = kline[4]
-                volume = kline[5]
+        # データをCSVに保存（時刻は列単位で一括変換）。キャッシュがあれば末尾に追記
+        df = pd.DataFrame(klines, columns=CSV_COLUMNS)
+        df["timestamp"] = pd.to_datetime(df["timestamp"].astype(np.int64), unit="ms", utc=True)
+        if last_ts is not None:
+            df.to_csv(OUTPUT_FILE, mode="a", header=False, index=False)
+        else:
+            df.to_csv(OUTPUT_FILE, index=False)
 
-                writer.writerow([dt_obj, open_price, high_price, low_price, close_price, volume])
+        META_FILE.write_text(json.dumps({
+            **META_SOURCE,
+            "last_ts": int(klines[-1, 0]),
+            "rows": cached_rows + len(klines),
+        }))
 
         print(f"データを指定のパスに保存しました: {OUTPUT_FILE}")
     else:
@@ -216,4 +328,7 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    try:
+        main()
+    finally:
+        SESSION.close()
\ No newline at end of file
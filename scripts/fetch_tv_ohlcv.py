@@ -4,16 +4,21 @@ TradingView 非公開 "history" API で
 MEXC Futures SOL/USDT:USDT の 1 分足を最大 90 日取得して CSV 保存。
 
 * 30 日ごとに 3 バッチ取得
-* tvc2〜tvc10 を順に試して 403/429 を自動回避
+* tvc2〜tvc10 へ並列に HEAD を投げて生きているホストを選び、403/429 時は残りを順に試す
 * User-Agent / Referer / Origin ヘッダーを付与
+* 既存 CSV があれば最終足以降だけを取得して追記
 """
 
 import csv
 import datetime as dt
+import json
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
+import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
 
 # ------------------ 取得設定 ------------------ #
 SYMBOL = "SOLUSDT.P"          # TV 先物シンボル。SOL/USDT:USDT は ".P" が付く
@@ -21,22 +26,54 @@ RESOLUTION = "1"              # 1 分足
 PERIOD_DAYS = 30
 TOTAL_DAYS = 90
 OUT_CSV = Path("src/data/ohlcv_1m.csv")
+META_FILE = OUT_CSV.with_suffix(".meta.json")   # {"source": "tv", "unit": "s", "last_ts": epoch 秒, "rows": n}
+CSV_COLUMNS = ["datetime", "open", "high", "low", "close", "volume"]
+# 同じパスへ書く fetch_ohlcv_ccxt.py とは時刻の単位・列名が違うので、メタに出所を残して区別する
+META_SOURCE = {"source": "tv", "unit": "s"}
 
 TV_HOSTS = [f"https://tvc{i}.forexpros.com" for i in range(2, 11)]
+HISTORY_PATH = "/58c954110f02e3f7b8b54dcb9cdfc28e/1675667223/56/56/43/history"
 HEADERS = {
     "User-Agent": "Mozilla/5.0",
     "Referer": "https://jp.tradingview.com/",
     "Origin": "https://jp.tradingview.com",
 }
 RATE_LIMIT_SEC = 1.5          # Cloudflare ブロックを避ける待機
+PROBE_TIMEOUT_SEC = 5
+
+# チャンク間で TCP/TLS を使い回す keep-alive セッション（ホストごとにプール）
+SESSION = requests.Session()
+SESSION.headers.update(HEADERS)
+SESSION.mount("https://", HTTPAdapter(pool_connections=len(TV_HOSTS), pool_maxsize=10))
 
 # --------------------------------------------- #
+def _head(host: str):
+    r = SESSION.head(host + HISTORY_PATH, timeout=PROBE_TIMEOUT_SEC)
+    return host, r.ok
+
+def probe_host():
+    """全ホストへ並列に HEAD を投げ、最初に 2xx を返したホストを返す。全滅なら None"""
+    ex = ThreadPoolExecutor(max_workers=len(TV_HOSTS))
+    futures = [ex.submit(_head, host) for host in TV_HOSTS]
+    try:
+        for fut in as_completed(futures):
+            try:
+                host, ok = fut.result()
+            except requests.RequestException:
+                continue
+            if ok:
+                return host
+        return None
+    finally:
+        # 勝者が決まったら残りの応答は待たない
+        ex.shutdown(wait=False, cancel_futures=True)
+
 def fetch_chunk(host: str, symbol: str, res: str, frm: int, to: int):
     """単一 30 日チャンクを取得。失敗すると None を返す"""
-    url = f"{host}/58c954110f02e3f7b8b54dcb9cdfc28e/1675667223/56/56/43/history"
+    url = host + HISTORY_PATH
     params = {"symbol": symbol, "resolution": res, "from": frm, "to": to}
     try:
-        r = requests.get(url, params=params, headers=HEADERS, timeout=10)
+        r = SESSION.get(url, params=params, timeout=10)
         if r.status_code in (403, 429):
             return None          # 次のホストへ
         r.raise_for_status()
@@ -47,20 +84,75 @@ def fetch_chunk(host: str, symbol: str, res: str, frm: int, to: int):
     except Exception:
         return None
 
-def fetch_history():
+def load_cached_state():
+    """保存済み CSV の (最終足 epoch 秒, 行数) を返す。キャッシュが無ければ None"""
+    if not OUT_CSV.exists():
+        return None
+
+    with OUT_CSV.open(newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        # 別スクリプトが書いた CSV（列名が違う）は続きとして使わず、全期間を取り直して上書きする
+        if header != CSV_COLUMNS:
+            print(f"既存 CSV の形式が異なるため全期間を取得し直します: {OUT_CSV}")
+            return None
+
+        # 出所・単位が一致するサイドカーがあれば本体を読まずに済む
+        if META_FILE.exists():
+            try:
+                meta = json.loads(META_FILE.read_text())
+                if all(meta.get(k) == v for k, v in META_SOURCE.items()):
+                    return int(meta["last_ts"]), int(meta["rows"])
+            except (ValueError, KeyError):
+                pass
+
+        # サイドカーが使えない場合だけ CSV を読む（時系列順なので最終行が最新）
+        rows = list(reader)
+    if not rows:
+        return None
+    last = dt.datetime.fromisoformat(rows[-1][0]).replace(tzinfo=dt.timezone.utc)
+    return int(last.timestamp()), len(rows)
+
+def fetch_history(since=None):
+    """
+    since (epoch 秒) を渡すとその時刻より後だけを取得する（確定済みの足のみ）
+
+    Returns
+    -------
+    (rows, complete)
+        取得した足と、途中のチャンクで失敗せず全期間を取れたかどうか
+    """
     end_ts = int(time.time())
+    end_ts -= end_ts % 60       # 形成中の足を含めないよう、確定済みの最後の分境界で切る
+    closed_ts = end_ts
     all_rows = []
+    complete = True
+
+    # 生きているホストを先頭に。以降も成功したホストを優先して使い回す
+    active = probe_host()
+    hosts = list(TV_HOSTS)
+    if active:
+        print(f"Active host: {active.split('//')[1]}")
+        hosts.remove(active)
+        hosts.insert(0, active)
 
     for i in range(TOTAL_DAYS // PERIOD_DAYS):
         start_ts = end_ts - PERIOD_DAYS * 24 * 60 * 60
+        if since is not None:
+            start_ts = max(start_ts, since)
+        if start_ts >= end_ts:
+            break
         print(f"[Chunk {i+1}] {dt.datetime.utcfromtimestamp(start_ts)} → {dt.datetime.utcfromtimestamp(end_ts)}")
 
-        # ホストを順に試す
+        # 優先ホストから順に試す
         rows = None
-        for host in TV_HOSTS:
+        for host in hosts:
             rows = fetch_chunk(host, SYMBOL, RESOLUTION, start_ts, end_ts)
             if rows:
                 print(f"  ✓ {host.split('//')[1]} 取得 {len(rows)} 本")
+                if host != hosts[0]:
+                    hosts.remove(host)
+                    hosts.insert(0, host)
                 break
             else:
                 print(f"  ✗ {host.split('//')[1]} 403/500 で失敗")
@@ -68,28 +160,45 @@ def fetch_history():
 
         if not rows:
             print("  どのホストでも取得できませんでした → 中断")
+            complete = False
             break
 
         all_rows = rows + all_rows
+        if since is not None and start_ts <= since:
+            break                   # キャッシュ済みの範囲に到達
         end_ts = start_ts           # 次はさらに過去へ
         time.sleep(RATE_LIMIT_SEC)  # レート制限
 
+    # to を含めて返る形成中の足（closed_ts 以降）は捨てる。次回は確定後に追記される
+    all_rows = [r for r in all_rows if r[0] < closed_ts]
     print(f"\nTotal rows fetched: {len(all_rows)}")
-    return all_rows
+    return all_rows, complete
 
-def save_csv(rows):
+def save_csv(rows, append=False, cached_rows=0):
     OUT_CSV.parent.mkdir(parents=True, exist_ok=True)
-    with OUT_CSV.open("w", newline="") as f:
-        w = csv.writer(f)
-        w.writerow(["datetime", "open", "high", "low", "close", "volume"])
-        for ts, o, h, l, c, v in rows:
-            w.writerow([dt.datetime.utcfromtimestamp(ts), o, h, l, c, v])
+    df = pd.DataFrame(rows, columns=CSV_COLUMNS)
+    # 行ごとに datetime を生成せず、列単位で一括変換（naive UTC、従来と同じ表記）
+    df["datetime"] = pd.to_datetime(df["datetime"], unit="s")
+    df.to_csv(OUT_CSV, mode="a" if append else "w", header=not append, index=False)
+    META_FILE.write_text(json.dumps({**META_SOURCE, "last_ts": rows[-1][0], "rows": cached_rows + len(rows)}))
     print("Saved →", OUT_CSV)
 
 def main():
-    rows = fetch_history()
+    cached = load_cached_state()
+    since, cached_rows = cached if cached else (None, 0)
+
+    rows, complete = fetch_history(since)
+    if not complete:
+        # 新しい側から遡って取るので、欠けるのは取得済みより古い範囲。
+        # このまま保存して last_ts を進めると、次回以降は穴を取り直さない
+        print("取得に失敗したチャンクがあるため CSV 保存をスキップしました（次回取り直します）。")
+        return
+    if since is not None:
+        # チャンク境界や最終足の重複を除き、キャッシュより新しい足だけ残す
+        rows = [r for r in rows if r[0] > since]
+
     if rows:
-        save_csv(rows)
+        save_csv(rows, append=since is not None, cached_rows=cached_rows)
     else:
         print("取得ゼロ行のため CSV 保存をスキップしました。")
 
@@ -11,44 +11,28 @@ from __future__ import annotations
 import asyncio
 import logging
 import os
+import queue
 import signal
 import sys
 import threading
 import time
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 from typing import Optional
 
-# ──────────────────────────
-#  ロギング（ファイル + コンソール）
-# ──────────────────────────
-LOG_DIR = Path(__file__).resolve().parent.parent / "logs"
-LOG_DIR.mkdir(exist_ok=True)
-
-_fmt = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+BASE_DIR = Path(__file__).resolve().parent.parent   # プロジェクトルート
+LOG_DIR  = BASE_DIR / "logs"
+ENV_PATH = BASE_DIR / "config" / ".env"
 
-logging.basicConfig(
-    level=logging.INFO,
-    format=_fmt,
-    handlers=[
-        logging.FileHandler(LOG_DIR / "run_bot.log", encoding="utf-8"),
-        logging.StreamHandler(sys.stdout),
-    ],
-)
 logger = logging.getLogger(__name__)
 
 # ──────────────────────────
 #  .env 読み込み（フルパス固定）
+#  src.core.order_manager が import 時に UID 等を読むため、外部モジュールより先に行う
 # ──────────────────────────
 from dotenv import load_dotenv
 
-BASE_DIR = Path(__file__).resolve().parent.parent   # プロジェクトルート
-ENV_PATH = BASE_DIR / "config" / ".env"
-
-if ENV_PATH.exists():
-    load_dotenv(dotenv_path=ENV_PATH)
-    logger.info(f".env loaded from {ENV_PATH}")
-else:
-    logger.warning(f".env not found at {ENV_PATH} – OS 環境変数を参照します。")
+_ENV_LOADED = ENV_PATH.exists() and load_dotenv(dotenv_path=ENV_PATH)
 
 # ──────────────────────────
 #  外部モジュール
@@ -59,20 +43,68 @@ from src.monitor.stats_tracker import StatsTracker
 from src.monitor.risk_guard import RiskGuard
 from src.data.data_handler import DataHandler1m
 
-# Windows は SelectorLoop 強制
-if sys.platform == "win32":
-    asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+# ──────────────────────────
+#  ロギング（ファイル + コンソール）
+# ──────────────────────────
+def setup_logging() -> QueueListener:
+    """
+    ログ出力先の作成とハンドラ設定（import 時には行わない）
+
+    ファイル / コンソールへの書き込みは QueueListener のスレッドが行い、
+    ログを出す側（イベントループ・WS・ExitWorker）はキューに積むだけで戻る。
+
+    Returns
+    -------
+    QueueListener
+        起動済みリスナー。終了時に stop() でキューを吐き切る
+    """
+    LOG_DIR.mkdir(exist_ok=True)
+    formatter = logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+    handlers = [
+        logging.FileHandler(LOG_DIR / "run_bot.log", encoding="utf-8"),
+        logging.StreamHandler(sys.stdout),
+    ]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(-1)
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    logging.basicConfig(level=logging.INFO, handlers=[QueueHandler(log_queue)])
+    listener.start()
+
+    if _ENV_LOADED:
+        logger.info(".env loaded from %s", ENV_PATH)
+    else:
+        logger.warning(".env not found at %s – OS 環境変数を参照します。", ENV_PATH)
+    return listener
+
+def install_event_loop() -> None:
+    """uvloop / winloop が入っていれば使い、無ければ標準ループ"""
+    if sys.platform == "win32":
+        try:
+            import winloop
+            winloop.install()
+        except ImportError:
+            # Windows は SelectorLoop 強制
+            asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    else:
+        try:
+            import uvloop
+            uvloop.install()
+        except ImportError:
+            pass
 
 # ──────────────────────────
-#  グローバルインスタンス
+#  設定
 # ──────────────────────────
 SYMBOL = os.getenv("WS_SYMBOL", "SOL_USDT")
 LOT    = os.getenv("LOT_SIZE", "0.01")
 
-strategy      = WBARSimpleStrategy(symbol=SYMBOL, lot=LOT)
-stats_tracker = StatsTracker()
-stop_event    = threading.Event()
-risk_guard    = RiskGuard(stop_event=stop_event)
+EXC_TRACE_INTERVAL = 60   # 同一例外のトレースバックを出す最小間隔（秒）
+ERR_BACKOFF_MAX    = 30   # 連続エラー時の待機上限（秒）
+
+# シグナルハンドラと各スレッドで共有する停止フラグ（Event 生成は副作用なし）
+stop_event = threading.Event()
 
 def get_account_balance() -> float:
     return float(os.getenv("ACCOUNT_BALANCE_USDT", "1000"))
@@ -80,7 +112,11 @@ def get_account_balance() -> float:
 # ──────────────────────────
 #  WebSocket Listener スレッド
 # ──────────────────────────
-def ws_thread() -> None:
+def ws_thread(
+    strategy: WBARSimpleStrategy,
+    stats_tracker: StatsTracker,
+    risk_guard: RiskGuard,
+) -> None:
     class _ExtendedWS(WSListener):
         def __init__(self, strat: WBARSimpleStrategy):
             super().__init__(strat._om)
@@ -93,32 +129,64 @@ def ws_thread() -> None:
     try:
         _ExtendedWS(strategy).run_forever()
     except Exception as exc:
-        logger.exception(f"WS thread exception: {exc}")
+        logger.exception("WS thread exception: %s", exc)
         stop_event.set()
 
 # ──────────────────────────
 #  メイン async ループ
 # ──────────────────────────
 async def main_loop():
-    dh = DataHandler1m(symbol=SYMBOL, warmup=10)
-    await dh.initialize()
-
-    threading.Thread(target=ws_thread, name="WSListener", daemon=True).start()
+    strategy      = WBARSimpleStrategy(symbol=SYMBOL, lot=LOT)
+    stats_tracker = StatsTracker()
+    risk_guard    = RiskGuard(stop_event=stop_event)
+    strategy.start()
 
-    while not stop_event.is_set():
-        try:
-            bar = await dh.get_next_bar()
-            direction = strategy.evaluate(bar)           # "LONG"/"SHORT"/None
-            if direction:
-                entry_id: Optional[str] = strategy.place_entry(direction)
-                if entry_id:
-                    logger.info(f"Entry sent: {entry_id}")
-            else:
-                logger.info("No signal – wait next bar")
-
-        except Exception as exc:
-            logger.exception(f"Main loop error: {exc}")
-            time.sleep(1)
+    dh = DataHandler1m(symbol=SYMBOL, warmup=10)
+    try:
+        await dh.initialize()
+        strategy.update_market_data_batch(dh.bars)
+
+        threading.Thread(
+            target=ws_thread,
+            args=(strategy, stats_tracker, risk_guard),
+            name="WSListener",
+            daemon=True,
+        ).start()
+
+        last_exc_sig: Optional[tuple] = None
+        last_exc_ts = 0.0
+        backoff = 1.0
+
+        while not stop_event.is_set():
+            try:
+                bar = await dh.get_next_bar()
+                direction = strategy.evaluate(bar)           # "LONG"/"SHORT"/None
+                if direction:
+                    # 発注は同期 HTTP なのでワーカースレッドへ逃がし、イベントループを止めない
+                    entry_id: Optional[str] = await asyncio.to_thread(
+                        strategy.place_entry, direction
+                    )
+                    if entry_id:
+                        logger.info("Entry sent: %s", entry_id)
+                else:
+                    logger.info("No signal – wait next bar")
+                backoff = 1.0
+
+            except Exception as exc:
+                # 同じ例外が続く間はトレースバック整形を 1 分に 1 回へ抑える
+                sig = (type(exc).__name__, str(exc))
+                now = time.monotonic()
+                if sig == last_exc_sig and now - last_exc_ts < EXC_TRACE_INTERVAL:
+                    logger.error("Main loop error (repeat): %s", sig[1])
+                else:
+                    logger.exception("Main loop error: %s", exc)
+                    last_exc_sig, last_exc_ts = sig, now
+                # time.sleep はイベントループごと止めるので await で待つ（指数バックオフ）
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, ERR_BACKOFF_MAX)
+    finally:
+        # keep-alive タスクと HTTP セッションを閉じる（Unclosed session 警告も防ぐ）
+        await dh.aclose()
 
     logger.info("Stop event received – shutting down.")
 
@@ -126,17 +194,20 @@ async def main_loop():
 #  Graceful shutdown
 # ──────────────────────────
 def _signal_handler(sig, frame):
-    logger.info(f"Signal {sig} received – stopping …")
+    logger.info("Signal %s received – stopping …", sig)
     stop_event.set()
 
-signal.signal(signal.SIGINT,  _signal_handler)
-signal.signal(signal.SIGTERM, _signal_handler)
-
 # ──────────────────────────
 #  エントリポイント
 # ──────────────────────────
 if __name__ == "__main__":
+    log_listener = setup_logging()
+    install_event_loop()
+    signal.signal(signal.SIGINT,  _signal_handler)
+    signal.signal(signal.SIGTERM, _signal_handler)
     try:
         asyncio.run(main_loop())
     except KeyboardInterrupt:
         logger.info("KeyboardInterrupt – exiting.")
+    finally:
+        log_listener.stop()
@@ -9,15 +9,16 @@ OrderManager  ―  純成行（type = 5）専用の注文管理クラス
 
 from __future__ import annotations
 
-import json
+import hashlib
 import logging
 import os
+import queue
 import threading
 import time
-from collections import deque
-from typing import Deque, Dict, List, Optional
+from typing import Dict, Iterable, List, Optional
 
-from curl_cffi import requests
+import orjson
+from curl_cffi import CurlHttpVersion, requests
 from dotenv import load_dotenv
 
 # .env 読み込み（プロジェクトルートから辿る想定）
@@ -28,7 +29,9 @@ load_dotenv(dotenv_path=ENV_PATH)
 API_KEY = os.getenv("API_KEY")
 SECRET_KEY = os.getenv("SECRET_KEY")
 UID = os.getenv("UID")  # UID 署名用
-MEXC_CONTRACT_BASE_URL = os.getenv("MEXC_CONTRACT_BASE_URL")  # 例: https://contract.mexc.com
+MEXC_CONTRACT_BASE_URL = os.getenv(
+    "MEXC_CONTRACT_BASE_URL", "https://contract.mexc.com"
+)
 
 # --- ロギング ---
 logger = logging.getLogger(__name__)
@@ -38,14 +41,36 @@ logger.setLevel(logging.INFO)
 ENDPOINT_ORDER_CREATE = "/api/v1/private/order/submit"
 ENDPOINT_ORDER_CANCEL = "/api/v1/private/order/cancel"
 
+# 注文ごとに連結しないよう完成形 URL を保持
+ORDER_CREATE_URL = MEXC_CONTRACT_BASE_URL + ENDPOINT_ORDER_CREATE
+ORDER_CANCEL_URL = MEXC_CONTRACT_BASE_URL + ENDPOINT_ORDER_CANCEL
+
 ORDER_TYPE_MARKET: str = "5"  # 成行
 BUY: int = 1
 SELL: int = 2
 
+# エントリー / exit / cancel で共有する keep-alive セッション（HTTP/2）。
+# curl ハンドルはスレッドローカルなので ExitWorker スレッドからも安全に使える。
+_SESSION = requests.Session(http_version=CurlHttpVersion.V2TLS)
+
 
 # ------------------------------------------------------------------ #
 # 署名生成ヘルパ                                                     #
 # ------------------------------------------------------------------ #
+# md5 は API 仕様上の署名であり暗号用途ではない → usedforsecurity=False で FIPS 判定を省く
+# md5(UID + ts) の UID 部分を吸収済みのコンテキスト。署名ごとに copy() して ts だけ足す
+# UID 未設定なら None（空 UID で不正な署名を送らず、_uid_sign で例外にする）
+_UID_MD5 = (
+    hashlib.md5(UID.encode("utf-8"), usedforsecurity=False) if UID else None
+)
+if _UID_MD5 is None:
+    logger.error("UID is not set; orders cannot be signed.")
+
+
+def _md5_hex(data: bytes) -> str:
+    return hashlib.md5(data, usedforsecurity=False).hexdigest()
+
+
 def _uid_sign(body: dict) -> dict:
     """
     UID を使った MEXC 特有の署名生成
@@ -54,14 +79,40 @@ def _uid_sign(body: dict) -> dict:
     -------
     dict
         {"time": "...", "sign": "..."} を返す
+
+    Raises
+    ------
+    RuntimeError
+        UID が未設定の場合
     """
-    import hashlib
+    if _UID_MD5 is None:
+        raise RuntimeError("UID is not set; cannot sign MEXC request")
+    ts_b = b"%d" % (time.time_ns() // 1_000_000)
+    h = _UID_MD5.copy()
+    h.update(ts_b)
+    g = h.hexdigest()[7:]
+    # orjson はコンパクト表記の bytes を直接返す（キー順は dict の挿入順のまま）
+    s = orjson.dumps(body)
+    sign = _md5_hex(b"".join((ts_b, s, g.encode("ascii"))))
+    return {"time": ts_b.decode("ascii"), "sign": sign}
+
 
-    ts = str(int(time.time() * 1000))
-    g = hashlib.md5((UID + ts).encode("utf-8")).hexdigest()[7:]
-    s = json.dumps(body, separators=(",", ":"))
-    sign = hashlib.md5((ts + s + g).encode("utf-8")).hexdigest()
-    return {"time": ts, "sign": sign}
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+def _post_json(url: str, body: dict) -> dict:
+    """
+    body を orjson で直列化して POST し、応答も orjson でパース
+
+    Returns
+    -------
+    dict
+        API 応答 JSON
+    """
+    resp = _SESSION.post(
+        url, data=orjson.dumps(body), headers=_JSON_HEADERS, timeout=10
+    )
+    return orjson.loads(resp.content)
 
 
 # ------------------------------------------------------------------ #
@@ -81,20 +132,32 @@ class OrderManager:
         # orderId → {"tp_id": ..., "sl_id": ...}
         self._exit_map: Dict[str, Dict[str, str]] = {}
 
-        # exit キュー（TP/SL 市場注文用）
-        self._exit_queue: Deque[dict] = deque()
-        self._queue_lock = threading.Lock()
+        # 逆引き: TP / SL の orderId → entry orderId（on_fill を O(1) に）
+        self._tp_to_entry: Dict[str, str] = {}
+        self._sl_to_entry: Dict[str, str] = {}
 
-        # Exit キュー処理用スレッド
-        self._exit_worker = threading.Thread(
-            target=self._process_exit_queue, name="ExitWorker", daemon=True
-        )
-        self._exit_worker.start()
+        # WS スレッドとメインループの双方がマップを更新するため保護
+        self._map_lock = threading.Lock()
+
+        # exit キュー（TP/SL 市場注文用）。get() でブロックするのでポーリング不要
+        self._exit_queue: "queue.Queue[dict]" = queue.Queue()
+
+        # Exit キュー処理用スレッド（import / 生成だけでは起動しない → start()）
+        self._exit_worker: Optional[threading.Thread] = None
 
     # ------------------------------ #
     # Public API                     #
     # ------------------------------ #
 
+    def start(self) -> None:
+        """ExitWorker スレッドを起動（多重呼び出しは無視）"""
+        if self._exit_worker is not None:
+            return
+        self._exit_worker = threading.Thread(
+            target=self._process_exit_queue, name="ExitWorker", daemon=True
+        )
+        self._exit_worker.start()
+
     def create_market_order(
         self, side: int, vol: str, open_type: int = 1
     ) -> Optional[str]:
@@ -125,17 +188,15 @@ class OrderManager:
         }
         body.update(_uid_sign(body))
 
-        url = MEXC_CONTRACT_BASE_URL + ENDPOINT_ORDER_CREATE
         try:
-            resp = requests.post(url, json=body, timeout=10)
-            data = resp.json()
+            data = _post_json(ORDER_CREATE_URL, body)
             if data.get("success") and data.get("code") == 0:
                 order_id = str(data["data"])
-                logger.info(f"✅ Market entry sent: {order_id}")
+                logger.info("✅ Market entry sent: %s", order_id)
                 return order_id
-            logger.error(f"❌ ENTRY FAIL: {data}")
+            logger.error("❌ ENTRY FAIL: %s", data)
         except Exception as exc:
-            logger.exception(f"ENTRY EXCEPTION: {exc}")
+            logger.exception("ENTRY EXCEPTION: %s", exc)
         return None
 
     def queue_exit_market(
@@ -170,18 +231,24 @@ class OrderManager:
             "vol": vol,
         }
 
-        with self._queue_lock:
-            self._exit_queue.append(tp_payload)
-            self._exit_queue.append(sl_payload)
-            # キューに積んだ順に orderId が返る想定
+        # start() 前に呼ばれても exit が滞留しないよう起動を保証
+        self.start()
+
+        # キューに積んだ順に orderId が返る想定
+        with self._map_lock:
             self._exit_map[entry_order_id] = {"tp_id": None, "sl_id": None}
+        self._exit_queue.put(tp_payload)
+        self._exit_queue.put(sl_payload)
 
     def on_exit_order_created(
         self, tp_id: str, sl_id: str, entry_order_id: str
     ) -> None:
         """キューから exit 送信後、実際の orderId をマッピング"""
-        self._exit_map[entry_order_id]["tp_id"] = tp_id
-        self._exit_map[entry_order_id]["sl_id"] = sl_id
+        with self._map_lock:
+            self._exit_map[entry_order_id]["tp_id"] = tp_id
+            self._exit_map[entry_order_id]["sl_id"] = sl_id
+            self._tp_to_entry[tp_id] = entry_order_id
+            self._sl_to_entry[sl_id] = entry_order_id
 
     def on_fill(self, filled_order_id: str) -> None:
         """
@@ -190,61 +257,83 @@ class OrderManager:
         - TP が先に約定 → SL をキャンセル
         - SL が先に約定 → TP をキャンセル
         """
-        for entry_id, exit_dict in list(self._exit_map.items()):
-            tp_id = exit_dict.get("tp_id")
-            sl_id = exit_dict.get("sl_id")
+        self.on_fills((filled_order_id,))
 
-            if filled_order_id == tp_id and sl_id:
-                self.cancel_order(sl_id)
-                logger.info(f"OCO: TP filled ({tp_id}), SL {sl_id} cancelled")
-                del self._exit_map[entry_id]
+    def on_fills(self, filled_order_ids: Iterable[str]) -> None:
+        """
+        複数の fill 通知をまとめて処理（ロック取得は 1 回だけ）
+
+        Parameters
+        ----------
+        filled_order_ids : Iterable[str]
+            約定した orderId（WS の 1 回の受信バッチ分）
+        """
+        with self._map_lock:
+            hits = [h for h in map(self._pop_counterpart, filled_order_ids) if h]
 
-            elif filled_order_id == sl_id and tp_id:
-                self.cancel_order(tp_id)
-                logger.info(f"OCO: SL filled ({sl_id}), TP {tp_id} cancelled")
-                del self._exit_map[entry_id]
+        # cancel は HTTP 往復を伴うのでロック外で
+        for filled_order_id, filled, other, other_id in hits:
+            self.cancel_order(other_id)
+            logger.info(
+                "OCO: %s filled (%s), %s %s cancelled",
+                filled, filled_order_id, other, other_id,
+            )
 
     def cancel_order(self, order_id: str) -> bool:
         """単一注文をキャンセル"""
         body = {"orderId": order_id}
         body.update(_uid_sign(body))
 
-        url = MEXC_CONTRACT_BASE_URL + ENDPOINT_ORDER_CANCEL
         try:
-            resp = requests.post(url, json=body, timeout=10)
-            data = resp.json()
+            data = _post_json(ORDER_CANCEL_URL, body)
             if data.get("success"):
-                logger.info(f"🛑 CANCELED {order_id}")
+                logger.info("🛑 CANCELED %s", order_id)
                 return True
-            logger.error(f"❌ CANCEL FAIL: {data}")
+            logger.error("❌ CANCEL FAIL: %s", data)
         except Exception as exc:
-            logger.exception(f"CANCEL EXCEPTION: {exc}")
+            logger.exception("CANCEL EXCEPTION: %s", exc)
         return False
 
     # ------------------------------ #
     # Internal Worker                #
     # ------------------------------ #
 
+    def _pop_counterpart(self, filled_order_id: str) -> Optional[tuple]:
+        """
+        約定した exit の相方を OCO マップから外して返す（_map_lock 取得済みで呼ぶ）
+
+        Returns
+        -------
+        tuple | None
+            (filled_order_id, "TP"/"SL", "SL"/"TP", 相方 orderId)。監視外なら None
+        """
+        entry_id = self._tp_to_entry.pop(filled_order_id, None)
+        if entry_id is not None:
+            other_id = self._exit_map.pop(entry_id)["sl_id"]
+            self._sl_to_entry.pop(other_id, None)
+            return filled_order_id, "TP", "SL", other_id
+
+        entry_id = self._sl_to_entry.pop(filled_order_id, None)
+        if entry_id is not None:
+            other_id = self._exit_map.pop(entry_id)["tp_id"]
+            self._tp_to_entry.pop(other_id, None)
+            return filled_order_id, "SL", "TP", other_id
+        return None
+
     def _process_exit_queue(self) -> None:
         """バックグラウンドで exit キューを送信し続ける"""
         while True:
+            payload = self._exit_queue.get()   # 到着まで待機（到着即送信）
             try:
-                with self._queue_lock:
-                    if not self._exit_queue:
-                        time.sleep(0.1)
-                        continue
-                    payload = self._exit_queue.popleft()
-
                 payload.update(_uid_sign(payload))
-                url = MEXC_CONTRACT_BASE_URL + ENDPOINT_ORDER_CREATE
-                resp = requests.post(url, json=payload, timeout=10)
-                data = resp.json()
+                data = _post_json(ORDER_CREATE_URL, payload)
 
                 if data.get("success") and data.get("code") == 0:
-                    logger.info(f"➡️  Exit order sent: {data['data']}")
+                    logger.info("➡️  Exit order sent: %s", data["data"])
                 else:
-                    logger.error(f"❌ EXIT SEND FAIL: {data}")
+                    logger.error("❌ EXIT SEND FAIL: %s", data)
 
             except Exception as exc:
-                logger.exception(f"EXIT QUEUE EXCEPTION: {exc}")
-            time.sleep(0.05)
+                logger.exception("EXIT QUEUE EXCEPTION: %s", exc)
+            finally:
+                self._exit_queue.task_done()
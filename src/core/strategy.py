@@ -15,8 +15,9 @@ from __future__ import annotations
 
 import logging
 import os
-from typing import List, Optional
+from typing import Iterable, Optional
 
+from ..data.bars import Bar
 from .order_manager import BUY, SELL, OrderManager
 
 logger = logging.getLogger(__name__)
@@ -30,45 +31,65 @@ class WBARSimpleStrategy:
       - LONG なら次足始値で成行買い、TP/SL は RR1:1
     """
 
+    # direction → (entry side, TP side, SL side)
+    _DIR = {
+        "LONG":  (BUY, SELL, SELL),
+        "SHORT": (SELL, BUY, BUY),
+    }
+
     def __init__(self, symbol: str, lot: str):
         self._om  = OrderManager(symbol)
         self.lot  = lot
 
-        # 直近 2 本のバーを保持
-        self._hist: List[dict] = []
+        # 1 本前のバーの向きだけを保持（判定に必要なのはこれだけ）
+        self._prev_up: Optional[bool] = None
+        self._prev_dn: Optional[bool] = None
 
         # TP/SL 差分 (%) を .env から読む
         self._offset_pct = float(os.getenv("OFFSET_PCT", "0.15"))
 
+    def start(self) -> None:
+        """注文送信側のバックグラウンド処理（exit キューの送信スレッド）を起動する。多重呼び出し可"""
+        self._om.start()
+
+    # ------------------------------------------------------------------ #
+    #  ウォームアップ
+    # ------------------------------------------------------------------ #
+    def update_market_data_batch(self, bars: Iterable[Bar]) -> None:
+        """
+        ウォームアップ済みのバー列をまとめて履歴に流し込む。
+
+        次の判定に必要なのは最終バーの向きだけなので、それを一度に保持する。
+        """
+        bars = list(bars)
+        if bars:
+            last = bars[-1]
+            self._prev_up = last.close > last.open
+            self._prev_dn = last.close < last.open
+
     # ------------------------------------------------------------------ #
     #  シグナル判定
     # ------------------------------------------------------------------ #
-    def evaluate(self, bar: dict) -> Optional[str]:
+    def evaluate(self, bar: Bar) -> Optional[str]:
         """
         Parameters
         ----------
-        bar : dict
-            {"ts": .., "open": .., "close": .., ...}
+        bar : Bar
+            確定済みバー（ts, open, high, low, close, volume）
 
         Returns
         -------
         "LONG" / "SHORT" / None
         """
-        self._hist.append(bar)
-        if len(self._hist) < 2:
-            return None
-        if len(self._hist) > 2:
-            self._hist.pop(0)
+        up  = bar.close > bar.open
+        dn  = bar.close < bar.open
 
-        b1, b2 = self._hist  # b1 = 1 本前, b2 = 最新
-        up1  = b1["close"] > b1["open"]
-        up2  = b2["close"] > b2["open"]
-        dn1  = b1["close"] < b1["open"]
-        dn2  = b2["close"] < b2["open"]
+        prev_up, prev_dn = self._prev_up, self._prev_dn  # 1 本前
+        self._prev_up, self._prev_dn = up, dn
 
-        if up1 and up2:
+        if prev_up and up:
             return "LONG"
-        if dn1 and dn2:
+        if prev_dn and dn:
             return "SHORT"
         return None
 
@@ -81,14 +102,11 @@ class WBARSimpleStrategy:
         ----------
         direction : "LONG" または "SHORT"
         """
-        if direction == "LONG":
-            side     = BUY
-            tp_side  = SELL
-            sl_side  = SELL
-        else:
-            side     = SELL
-            tp_side  = BUY
-            sl_side  = BUY
+        try:
+            side, tp_side, sl_side = self._DIR[direction]
+        except KeyError:
+            logger.error("Unknown direction: %r", direction)
+            return None
 
         # 1) エントリー (成行 Market)
         entry_id = self._om.create_market_order(side=side, vol=self.lot)
@@ -103,5 +121,5 @@ class WBARSimpleStrategy:
             sl_side=sl_side,
             vol=self.lot,
         )
-        logger.info(f"Entry done. Queued TP/SL for {entry_id}")
+        logger.info("Entry done. Queued TP/SL for %s", entry_id)
         return entry_id
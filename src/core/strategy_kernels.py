@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+strategy_kernels.py
+===================
+
+WBARSimpleStrategy のシグナル判定を配列まとめて行う Numba カーネル
+-----------------------------------------------------------------
+* wbar_signals(o, c)          : 同方向 2 本連続で 1 (LONG) / -1 (SHORT) / 0
+* evaluate_array(open, close)  : 任意の配列を連続 float64 にそろえて wbar_signals
+* evaluate_all(bars)           : 列指向の Bars 全体を一括評価
+
+バックテスト・最適化で全バーを一括評価する用途。
+ライブ判定 (WBARSimpleStrategy.evaluate) と同じ規則だが、ライブの import を
+軽く保つため strategy.py からは参照しない。
+"""
+
+from __future__ import annotations
+
+import numpy as np
+from numba import njit
+
+from ..data.bars import Bars
+
+
+@njit(cache=True, boundscheck=False)
+def wbar_signals(o, c):
+    """
+    Parameters
+    ----------
+    o, c : float64[:]
+        始値 / 終値（連続配列）
+
+    Returns
+    -------
+    int8[:]
+        各バーのシグナル（先頭は常に 0）
+    """
+    n = o.shape[0]
+    out = np.zeros(n, dtype=np.int8)
+    for i in range(1, n):
+        if c[i] > o[i] and c[i - 1] > o[i - 1]:
+            out[i] = 1
+        elif c[i] < o[i] and c[i - 1] < o[i - 1]:
+            out[i] = -1
+    return out
+
+
+def evaluate_array(open_arr: np.ndarray, close_arr: np.ndarray) -> np.ndarray:
+    """
+    WBARSimpleStrategy.evaluate() のバッチ版（バックテスト用）
+
+    Returns
+    -------
+    np.ndarray[int8]
+        各バーのシグナル 1 = LONG, -1 = SHORT, 0 = なし（先頭は常に 0）
+    """
+    return wbar_signals(
+        np.ascontiguousarray(open_arr, dtype=np.float64),
+        np.ascontiguousarray(close_arr, dtype=np.float64),
+    )
+
+
+def evaluate_all(bars: Bars) -> np.ndarray:
+    """列指向の Bars 全体を一括評価する（戻り値は evaluate_array と同じ）"""
+    return evaluate_array(bars.o, bars.c)
@@ -6,21 +6,26 @@ ws_listener.py
 MEXC Futures 約定 WebSocket リスナー
 -----------------------------------
 * `sub.personal.order` チャンネルで自分の注文約定を監視
-* TP / SL いずれか fill ⇒ OrderManager.on_fill(order_id) へ伝播
+* TP / SL いずれか fill ⇒ OrderManager.on_fills([order_id, ...]) へまとめて伝播
 """
 
 from __future__ import annotations
 
 import asyncio
-import json
 import logging
-from typing import Any, Dict
+from typing import Any, Callable, Dict, List
 
+import orjson
 import websockets
 
 from .order_manager import OrderManager
 
 WS_ENDPOINT = "wss://contract.mexc.com/edge"
+DRAIN_WINDOW_SEC = 0.005   # 約定バーストをまとめる待ち時間
+DRAIN_MAX        = 64      # 1 バッチの最大件数
+RECONNECT_MIN_SEC = 1      # 再接続バックオフの初期値
+RECONNECT_MAX_SEC = 30     # 再接続バックオフの上限
+
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
@@ -31,45 +36,98 @@ class WSListener:
     def __init__(self, order_manager: OrderManager):
         self._om = order_manager
 
+        # 注文 state → ハンドラ。state は 1 回読んで 1 回引くだけ（3 = filled）
+        self._dispatch: Dict[int, Callable[[Dict[str, Any], List[str]], None]] = {
+            3: self._on_filled,
+        }
+
     # ──────────────────────────
     #  内部ハンドラ（asyncio）
     # ──────────────────────────
     async def _handler(self) -> None:
-        async with websockets.connect(WS_ENDPOINT, ping_interval=15) as ws:
-            # private 約定チャンネル購読
-            await ws.send(json.dumps({
-                "method": "sub.personal.order",
-                "param": {"symbol": self._om.symbol},
-                "id": 1,
-            }))
-            logger.info("✅ WS subscribed personal.order")
-
-            async for msg in ws:
-                try:
-                    data: Dict[str, Any] = json.loads(msg)
-                except json.JSONDecodeError:
-                    logger.debug(f"Skip non-JSON message: {msg[:80]} …")
-                    continue
-
-                raw = data.get("data")
-                if raw is None:
-                    continue
-
-                # data["data"] が JSON 文字列で来るケースに対応
-                if isinstance(raw, str):
+        """切断されたら指数バックオフ（1 → 30 秒）で再接続し続ける"""
+        backoff = RECONNECT_MIN_SEC
+        while True:
+            try:
+                # 約定通知は小さいフレームのみ → 圧縮を切りフレーム毎の展開コストを省く
+                async with websockets.connect(
+                    WS_ENDPOINT,
+                    ping_interval=15,
+                    ping_timeout=10,
+                    max_size=2**20,
+                    max_queue=1024,
+                    compression=None,
+                ) as ws:
+                    # private 約定チャンネル購読（テキストフレームで送る）
+                    await ws.send(orjson.dumps({
+                        "method": "sub.personal.order",
+                        "param": {"symbol": self._om.symbol},
+                        "id": 1,
+                    }).decode())
+                    logger.info("✅ WS subscribed personal.order")
+                    backoff = RECONNECT_MIN_SEC
+
+                    await self._consume(ws)
+                logger.warning("WS closed – reconnect in %.0fs", backoff)
+            except (websockets.WebSocketException, OSError) as exc:
+                logger.warning("WS error: %s – reconnect in %.0fs", exc, backoff)
+
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, RECONNECT_MAX_SEC)
+
+    async def _consume(self, ws) -> None:
+        """1 接続分の受信ループ"""
+        async for msg in ws:
+            pending: List[str] = []
+            self._collect_fill(msg, pending)
+            if not pending:
+                continue
+
+            # 約定はバーストで届くので、続けて届いている分を短い窓で吸い出してまとめて渡す
+            # （吸い出し中に切断されても、集めた分は finally で必ず渡す）
+            try:
+                while len(pending) < DRAIN_MAX:
                     try:
-                        raw = json.loads(raw)
-                    except json.JSONDecodeError:
-                        logger.debug(f"Skip non-dict payload: {raw[:80]} …")
-                        continue
-
-                if not isinstance(raw, dict):
-                    continue
-
-                if raw.get("state") == 3:           # 3 = filled
-                    filled_id = str(raw.get("orderId"))
-                    if filled_id:
-                        self._om.on_fill(filled_id)
+                        msg = await asyncio.wait_for(ws.recv(), timeout=DRAIN_WINDOW_SEC)
+                    except asyncio.TimeoutError:
+                        break
+                    self._collect_fill(msg, pending)
+            finally:
+                self._om.on_fills(pending)
+
+    def _collect_fill(self, msg, pending: List[str]) -> None:
+        """注文通知を state ごとのハンドラへ振り分ける（約定は pending に溜まる）"""
+        try:
+            data: Dict[str, Any] = orjson.loads(msg)
+        except orjson.JSONDecodeError:
+            logger.debug("Skip non-JSON message: %.80s …", msg)
+            return
+
+        raw = data.get("data")
+        if raw is None:
+            return
+
+        # data["data"] が JSON 文字列で来るケースに対応
+        if isinstance(raw, str):
+            try:
+                raw = orjson.loads(raw)
+            except orjson.JSONDecodeError:
+                logger.debug("Skip non-dict payload: %.80s …", raw)
+                return
+
+        if not isinstance(raw, dict):
+            return
+
+        handler = self._dispatch.get(raw.get("state"))
+        if handler is not None:
+            handler(raw, pending)
+
+    @staticmethod
+    def _on_filled(raw: Dict[str, Any], pending: List[str]) -> None:
+        """約定: orderId をバッチに追加（まとめて OrderManager.on_fills へ）"""
+        order_id = raw.get("orderId")
+        if order_id is not None:
+            pending.append(str(order_id))
 
     # ──────────────────────────
     #  外部呼び出し用
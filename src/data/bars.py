@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+bars.py  ―  OHLCV のバー表現
+----------------------------------------------------------------
+* Bar                 : 確定済み 1 本分（ライブの DataHandler1m → evaluate）
+* Bars                : 列指向 (Structure of Arrays) のバー列
+* BAR_DTYPE           : 1 行 = 1 本の構造化 dtype（DataHandler1m のキャッシュ）
+* Bars.from_frame()   : datetime-indexed DataFrame（バックテスト用）から生成
+
+各列が連続した np.ndarray なので、Numba カーネルへコピーなしで渡せる。
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, NamedTuple
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+# Bar と同じ並びの構造化 dtype。ライブの直近バー列はこの 1 本の配列で保持する
+BAR_DTYPE = np.dtype([
+    ("ts", "i8"),
+    ("open", "f8"),
+    ("high", "f8"),
+    ("low", "f8"),
+    ("close", "f8"),
+    ("volume", "f8"),
+])
+
+
+class Bar(NamedTuple):
+    """確定済み 1 本分の OHLCV（dict より小さく、属性アクセスも速い）"""
+
+    ts: int          # epoch 秒
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: float
+
+
+class Bars(NamedTuple):
+    """
+    同じ長さの 1 次元配列を 6 本束ねたもの
+
+    Attributes
+    ----------
+    ts : np.ndarray[int64]
+        epoch 秒
+    o, h, l, c, v : np.ndarray[float64]
+        始値 / 高値 / 安値 / 終値 / 出来高
+    """
+
+    ts: np.ndarray
+    o: np.ndarray
+    h: np.ndarray
+    l: np.ndarray
+    c: np.ndarray
+    v: np.ndarray
+
+    @property
+    def size(self) -> int:
+        """バー本数（len() はフィールド数になるので別名で持つ）"""
+        return self.ts.shape[0]
+
+    @classmethod
+    def from_frame(cls, df: "pd.DataFrame") -> "Bars":
+        """datetime-indexed, columns: open, high, low, close, volume の DataFrame から生成"""
+
+        def col(name: str) -> np.ndarray:
+            return np.ascontiguousarray(df[name].to_numpy(dtype=np.float64))
+
+        ts = np.asarray(df.index.values, dtype="datetime64[s]").astype(np.int64)
+        return cls(ts, col("open"), col("high"), col("low"), col("close"), col("volume"))
@@ -3,21 +3,28 @@
 DataHandler1m  ―  MEXC Futures の 1 分足フェッチを最小構成で
 ----------------------------------------------------------------
 * initialize()   : 最新 (warmup+1) 本をロードしてキャッシュ
-* get_next_bar() : 次の 1 分足が確定するまで await し、終値バーを返す
+* get_next_bar() : 次の 1 分足が確定するまで await し、確定バー (Bar) を返す
+* aclose()       : keep-alive タスクと HTTP セッションを閉じる（終了時に await）
 
 依存:
-    pip install curl-cffi
+    pip install curl-cffi orjson
 """
 
 from __future__ import annotations
 
 import asyncio
-import datetime as dt
+import contextlib
 import logging
+import random
 import time
-from typing import Dict, List
+from typing import List, Optional
 
-from curl_cffi import requests
+import numpy as np
+import orjson
+from curl_cffi import CurlHttpVersion
+from curl_cffi.requests import AsyncSession
+
+from .bars import BAR_DTYPE, Bar
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -27,92 +34,169 @@ BASE_URL     = "https://contract.mexc.com"
 INTERVAL     = "Min1"      # 1 m 足
 MAX_RETRY    = 10
 DEFAULT_WARM = 10          # ウォームアップ本数
+KEEPALIVE_SEC = 20         # アイドル中に接続を温めておく ping 間隔
+BAR_SETTLE_SEC = 0.2       # 分境界から最初の取得までの猶予
+BAR_JITTER_SEC = 0.3       # 複数インスタンスが同時に叩かないよう加えるゆらぎの上限
+POLL_INTERVAL = 0.5        # 新しい足が未反映のときの再ポーリング間隔
+MAX_POLL     = 20          # 再ポーリング回数の上限（既定で約 10 秒）
+PING_URL     = f"{BASE_URL}/api/v1/contract/ping"
+KLINE_COLS   = ("time", "open", "high", "low", "close", "vol")   # BAR_DTYPE と同じ並び
 # ─────────────────────────────────────────────
 
 
-def _utc_floor_minute() -> dt.datetime:
-    """UTC 現在時刻を秒以下 0 に丸めて返す"""
-    now = dt.datetime.utcnow().replace(tzinfo=dt.timezone.utc)
-    return now.replace(second=0, microsecond=0)
+def _seconds_to_next_minute() -> float:
+    """次の分境界までの秒数（datetime を生成せず epoch 秒の剰余で求める）"""
+    return 60 - time.time() % 60
 
 
 class DataHandler1m:
     """MEXC の 1 m Kline を取得してキャッシュする軽量クラス"""
 
-    def __init__(self, symbol: str, warmup: int = DEFAULT_WARM):
+    def __init__(
+        self,
+        symbol: str,
+        warmup: int = DEFAULT_WARM,
+        poll_interval: float = POLL_INTERVAL,
+        min_interval: Optional[float] = None,
+    ):
         self.symbol = symbol
         self._warm  = warmup
-        self._cache: List[Dict] = []
+        self._poll_interval = poll_interval
+        # テスト / バックフィル用: 指定時は分境界に合わせず固定間隔で取得
+        self._min_interval = min_interval
+        # 直近 warmup+1 本を 1 本の構造化配列で保持（新しい足は末尾、古い足は押し出し）
+        self._cache: np.ndarray = np.empty(0, dtype=BAR_DTYPE)
+
+        # 固定シンボル・固定本数なので URL とクエリは一度だけ組み立てる
+        # （末尾の形成中の足を捨てるため、必要本数 + 1 本を要求する）
+        self._url = f"{BASE_URL}/api/v1/contract/kline/{symbol}"
+        self._params = {
+            n: {"interval": INTERVAL, "limit": n + 1} for n in (warmup + 1, 2)
+        }
+
+        # keep-alive で TLS を使い回す非同期セッション（イベントループ上で遅延生成）
+        self._session: Optional[AsyncSession] = None
+        self._keepalive: Optional[asyncio.Task] = None
 
     # ─────────────── public ─────────────── #
 
+    @property
+    def bars(self) -> List[Bar]:
+        """キャッシュ済みバー（古い順）"""
+        return [Bar(*row) for row in self._cache.tolist()]
+
     async def initialize(self):
         """最新 warmup+1 本を取得してキャッシュ"""
-        bars = self._fetch_bars(self._warm + 1)
-        if not bars:
+        bars = await self._fetch_bars(self._warm + 1)
+        if bars is None:
             raise RuntimeError("Failed to fetch warm-up bars.")
         self._cache = bars
-        logger.info(f"Warmed up {len(bars)} bars.")
-
-    async def get_next_bar(self) -> Dict:
-        """次の 1 分足が確定するまで待機し、最新バー dict を返す"""
-        now = _utc_floor_minute()
-        await asyncio.sleep(60 - now.second + 1)
+        logger.info("Warmed up %d bars.", len(bars))
+
+    async def get_next_bar(self) -> Bar:
+        """次の 1 分足が確定するまで待機し、最新バーを返す"""
+        if self._min_interval is not None:
+            await asyncio.sleep(self._min_interval)
+        else:
+            # 新しい足は分境界でしか出ないので、境界直後まで 1 回だけ眠る
+            await asyncio.sleep(
+                _seconds_to_next_minute()
+                + BAR_SETTLE_SEC
+                + random.uniform(0, BAR_JITTER_SEC)
+            )
+
+        for _ in range(MAX_POLL):
+            bars = await self._fetch_bars(2)
+            if bars is None:
+                raise RuntimeError("Failed to fetch new bar.")
+
+            latest = bars[-1]
+            if latest["ts"] != self._cache[-1]["ts"]:
+                # 固定長のまま 1 本ずらして末尾に書き込む（再確保なし）
+                self._cache[:-1] = self._cache[1:]
+                self._cache[-1] = latest
+                return Bar(*latest.tolist())
+
+            # 同じ足 = 取引所側の更新待ち。1 分待ち直さず短い間隔で再ポーリング
+            await asyncio.sleep(self._poll_interval)
+
+        raise RuntimeError(f"New bar not published after {MAX_POLL} polls.")
+
+    async def aclose(self) -> None:
+        """keep-alive タスクを止めてセッションを閉じる"""
+        if self._keepalive is not None:
+            self._keepalive.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._keepalive
+            self._keepalive = None
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
 
-        bars = self._fetch_bars(2)
-        if not bars:
-            raise RuntimeError("Failed to fetch new bar.")
-
-        latest = bars[-1]
-        if latest["ts"] == self._cache[-1]["ts"]:
-            return await self.get_next_bar()          # 同じ足なら再待機
+    # ─────────────── internal ─────────────── #
 
-        self._cache.append(latest)
-        if len(self._cache) > self._warm + 1:
-            self._cache.pop(0)
-        return latest
+    def _get_session(self) -> AsyncSession:
+        """セッションと keep-alive タスクをイベントループ上で遅延生成"""
+        if self._session is None:
+            # HTTP/2 を明示し、リトライやリクエストを 1 本の TLS 接続上に多重化する
+            self._session = AsyncSession(http_version=CurlHttpVersion.V2TLS)
+            self._keepalive = asyncio.create_task(self._keep_warm())
+        return self._session
 
-    # ─────────────── internal ─────────────── #
+    async def _keep_warm(self) -> None:
+        """
+        足待ちの約 1 分間に接続がアイドル切断されないよう、軽量な ping を定期送信。
+        次の足の取得で TCP/TLS ハンドシェイクをやり直さずに済む。
+        """
+        while True:
+            await asyncio.sleep(KEEPALIVE_SEC)
+            try:
+                await self._session.get(PING_URL, timeout=5)
+            except Exception as e:
+                logger.debug("Keep-alive ping fail: %s", e)
 
-    def _fetch_bars(self, limit: int) -> List[Dict]:
+    async def _fetch_bars(self, limit: int) -> Optional[np.ndarray]:
         """
         /contract/kline/{symbol}?interval=Min1&limit=N
-        を叩いて直近 limit 本の OHLCV を返す。
+        を叩いて確定済みの直近 limit 本の OHLCV を BAR_DTYPE の構造化配列で返す。
+        全リトライ失敗時は None。
         """
-        url    = f"{BASE_URL}/api/v1/contract/kline/{self.symbol}"
-        params = {"interval": INTERVAL, "limit": limit}
+        params = self._params.get(limit) or {"interval": INTERVAL, "limit": limit + 1}
+
+        session = self._get_session()
 
         for _ in range(MAX_RETRY):
             try:
-                r = requests.get(url, params=params, timeout=10)
-                data = r.json()
+                r = await session.get(self._url, params=params, timeout=10)
+                data = orjson.loads(r.content)
 
                 # 成功判定
                 if not (isinstance(data, dict) and data.get("success")):
-                    time.sleep(1)
+                    await asyncio.sleep(1)
                     continue
 
                 k = data["data"]                      # 列ごとの配列
                 if len(k["time"]) < limit:
-                    time.sleep(1)
+                    await asyncio.sleep(1)
                     continue
 
-                bars = [
-                    {
-                        "ts":     k["time"] [-limit:][i],          # epoch 秒
-                        "open":  float(k["open"] [-limit:][i]),
-                        "high":  float(k["high"] [-limit:][i]),
-                        "low":   float(k["low"]  [-limit:][i]),
-                        "close": float(k["close"][-limit:][i]),
-                        "volume":float(k["vol"]  [-limit:][i]),
-                    }
-                    for i in range(limit)
-                ]
+                # 列ごとに 1 回だけスライスし、そのままフィールドへ一括代入
+                cols = [k[c][-(limit + 1):] for c in KLINE_COLS]
+                bars = np.empty(len(cols[0]), dtype=BAR_DTYPE)
+                for name, col in zip(BAR_DTYPE.names, cols):
+                    bars[name] = col                             # ts: epoch 秒
+
+                # 形成中の足（開始から 60 秒未満）を除く。現在時刻は 1 回だけ取り整数で比較
+                cutoff = int(time.time()) - 60
+                bars = bars[bars["ts"] <= cutoff][-limit:]
+                if len(bars) < limit:
+                    await asyncio.sleep(1)
+                    continue
                 return bars
 
             except Exception as e:
-                logger.debug(f"Kline fetch retry fail: {e}")
-                time.sleep(1)
+                logger.debug("Kline fetch retry fail: %s", e)
+                await asyncio.sleep(1)
 
         logger.error("All retries failed – no Kline data.")
-        return []
+        return None
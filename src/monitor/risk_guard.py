@@ -16,6 +16,7 @@ from __future__ import annotations
 import datetime as _dt
 import logging
 import os
+import time
 from typing import Deque
 
 from collections import deque
@@ -27,20 +28,26 @@ logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
 
+def _next_local_midnight() -> float:
+    """次のローカル 0 時（日次リセット時刻）の epoch 秒"""
+    tomorrow = _dt.date.today() + _dt.timedelta(days=1)
+    return _dt.datetime.combine(tomorrow, _dt.time()).timestamp()
+
+
 class RiskGuard:
     """日次損失・連敗数を監視し、超えたら停止イベントを立てる。"""
 
     def __init__(self, stop_event):
         self._stop_event = stop_event
-        self._day = _dt.date.today()
+        # 日付オブジェクトを毎取引作らず、次のリセット時刻 (epoch 秒) と数値比較する
+        self._day_end = _next_local_midnight()
         self._daily_pnl = 0.0
         self._consec_losses: Deque[float] = deque(maxlen=MAX_CONSECUTIVE_LOSS)
 
     def on_trade(self, pnl: float, balance: float) -> None:
-        today = _dt.date.today()
-        if today != self._day:
+        if time.time() >= self._day_end:
             # 新しい日になったらリセット
-            self._day = today
+            self._day_end = _next_local_midnight()
             self._daily_pnl = 0.0
             self._consec_losses.clear()
 
@@ -52,9 +59,9 @@ class RiskGuard:
         consec_loss_cnt = sum(1 for x in self._consec_losses if x < 0)
 
         if daily_loss_pct <= MAX_DAILY_LOSS_PCT:
-            logger.error(f"[RiskGuard] Daily loss {daily_loss_pct:.2f}% exceeds limit.")
+            logger.error("[RiskGuard] Daily loss %.2f%% exceeds limit.", daily_loss_pct)
             self._stop_event.set()
 
         if consec_loss_cnt >= MAX_CONSECUTIVE_LOSS:
-            logger.error(f"[RiskGuard] {consec_loss_cnt} consecutive losses.")
+            logger.error("[RiskGuard] %d consecutive losses.", consec_loss_cnt)
             self._stop_event.set()
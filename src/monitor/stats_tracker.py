@@ -15,17 +15,18 @@ StatsTracker
 from __future__ import annotations
 
 import datetime as _dt
-import json
 import logging
 import os
+from collections import deque
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Deque, Dict
 
-import pandas as pd
+import orjson
 
 # ------------------------  設定  ------------------------ #
 LOG_DIR = Path(os.getenv("STATS_LOG_DIR", "stats"))
 LOG_DIR.mkdir(exist_ok=True)
+STATS_FILE = LOG_DIR / "stats.ndjson"   # 1 行 = 1 取引の追記専用ログ
 
 ROLLING_WINDOW_TRADES = int(os.getenv("ROLLING_WINDOW_TRADES", 200))  # 直近 n 取引で評価
 WARN_WINRATE = float(os.getenv("WARN_WINRATE", 0.53))                # ↓で WARN
@@ -40,7 +41,15 @@ class StatsTracker:
     """トレードパフォーマンスをローリングで追跡します。"""
 
     def __init__(self) -> None:
-        self._records: List[Dict] = []
+        # 直近 ROLLING_WINDOW_TRADES 件（古い取引は deque が自動で押し出す）
+        self._records: Deque[Dict] = deque(maxlen=ROLLING_WINDOW_TRADES)
+
+        # 窓内の集計値。追加・押し出しのたびに差分だけ更新する
+        # 件数は整数で持ち、0 件になった側の合計は 0.0 に戻して丸め誤差の残留を防ぐ
+        self._wins = 0
+        self._losses = 0
+        self._gross_profit = 0.0
+        self._gross_loss = 0.0
 
     # ------------------------  公開 API ------------------------ #
 
@@ -55,46 +64,52 @@ class StatsTracker:
         pnl : float
             トレードの損益（USDT）
         """
-        self._records.append(
-            {
-                "timestamp": _dt.datetime.utcnow().isoformat(),
-                "side": side,
-                "pnl": pnl,
-            }
-        )
-
-        # ローリング窓を維持
-        if len(self._records) > ROLLING_WINDOW_TRADES:
-            self._records.pop(0)
-
-        self._save_json()
+        record = {
+            "timestamp": _dt.datetime.now(_dt.timezone.utc).isoformat(),
+            "side": side,
+            "pnl": pnl,
+        }
+
+        # ローリング窓を維持（押し出される取引の寄与を先に差し引く）
+        if len(self._records) == self._records.maxlen:
+            self._account(self._records[0]["pnl"], -1)
+        self._records.append(record)
+        self._account(pnl, 1)
+
+        self._append_log(record)
         self._check_warn()
 
     # --------------------  内部処理 -------------------- #
-    def _save_json(self) -> None:
-        with open(LOG_DIR / "stats.json", "w", encoding="utf-8") as fp:
-            json.dump(self._records, fp, ensure_ascii=False, indent=2)
+    def _account(self, pnl: float, sign: int) -> None:
+        """集計値に 1 取引分を加算 (sign=1) / 減算 (sign=-1)"""
+        if pnl > 0:
+            self._wins += sign
+            self._gross_profit = self._gross_profit + sign * pnl if self._wins else 0.0
+        elif pnl < 0:
+            self._losses += sign
+            self._gross_loss = self._gross_loss - sign * pnl if self._losses else 0.0
+
+    def _append_log(self, record: Dict) -> None:
+        """全件を書き直さず、1 取引分を 1 行だけ追記"""
+        with open(STATS_FILE, "ab") as fp:
+            fp.write(orjson.dumps(record) + b"\n")
 
     def _check_warn(self) -> None:
         """勝率・PF が閾値を下回ったら WARN"""
 
-        df = pd.DataFrame(self._records)
-        if df.empty:
+        total = len(self._records)
+        if not total:
             return
 
-        wins = (df["pnl"] > 0).sum()
-        total = len(df)
-        winrate = wins / total
-        gross_profit = df.loc[df["pnl"] > 0, "pnl"].sum()
-        gross_loss = -df.loc[df["pnl"] < 0, "pnl"].sum()
-        pf = gross_profit / gross_loss if gross_loss else float("inf")
+        winrate = self._wins / total
+        gross_loss = self._gross_loss
+        pf = self._gross_profit / gross_loss if gross_loss else float("inf")
 
-        logger.info(
-            f"[Stats] Trades={total} WinRate={winrate:.2%} PF={pf:.2f}"
-        )
+        logger.info("[Stats] Trades=%d WinRate=%.2f%% PF=%.2f", total, winrate * 100, pf)
 
         if winrate < WARN_WINRATE or pf < WARN_PF:
             logger.warning(
-                f"[WARN] Performance deteriorated: WinRate {winrate:.2%}, PF {pf:.2f}"
+                "[WARN] Performance deteriorated: WinRate %.2f%%, PF %.2f",
+                winrate * 100, pf,
             )
             # === Notifier 連携ポイント（必要なら実装）=== #
@@ -8,40 +8,182 @@ DataFrame (datetime-indexed, columns: open, high, low, close, volume)
 
 from __future__ import annotations
 
+from typing import NamedTuple, Optional, Tuple
+
 import numpy as np
 import pandas as pd
+from numba import njit
+
+from ..core.strategy_kernels import wbar_signals
+from ..data.bars import Bars
+
+
+@njit(cache=True)
+def _rolling_mean(x, window):
+    """
+    pandas の ``rolling(window).mean()`` 相当を 1 パスの移動和で求める。
+
+    先頭 window-1 本と、窓内に NaN を含む位置は NaN（pandas と同じ扱い）。
+    """
+    n = x.shape[0]
+    out = np.full(n, np.nan)
+    s = 0.0
+    n_nan = 0
+
+    for i in range(n):
+        v = x[i]
+        if np.isnan(v):
+            n_nan += 1
+        else:
+            s += v
+
+        if i >= window:
+            old = x[i - window]
+            if np.isnan(old):
+                n_nan -= 1
+            else:
+                s -= old
+
+        if i >= window - 1 and n_nan == 0:
+            out[i] = s / window
+
+    return out
+
+
+class _Features(NamedTuple):
+    """パラメータに依存しない特徴量（同じ DataFrame なら全 trial で共通）"""
+
+    bars: Bars
+    direction: np.ndarray   # 同方向 2 本連続 (+1 / -1 / 0)
+    avg_vol: np.ndarray     # 出来高 30 本平均
+    atr_pct: np.ndarray     # 簡易 ATR(14) の終値比 (%)
+
+
+# 直近に計算した (DataFrame, 特徴量)。df 自体を保持するので id の再利用で誤ヒットしない
+_feature_cache: Optional[Tuple[pd.DataFrame, _Features]] = None
+
+
+def _features(df: pd.DataFrame) -> _Features:
+    """
+    df ごとに 1 回だけ特徴量を計算してキャッシュする。
+
+    Optuna の各 trial は同じ test_df に対してパラメータだけを変えて呼ぶので、
+    2 回目以降は閾値比較だけで済む。
+    """
+    global _feature_cache
+    if _feature_cache is not None and _feature_cache[0] is df:
+        return _feature_cache[1]
+
+    # 列ごとに連続した配列 (SoA) にしておき、シグナル計算とカーネルでコピーなしに走査
+    bars = Bars.from_frame(df)
+    h, l, c = bars.h, bars.l, bars.c
+
+    # 同方向 2 本連続（ライブの WBARSimpleStrategy と同じカーネル）
+    direction = wbar_signals(bars.o, c)
 
+    # 簡易 ATR
+    prev_c = np.empty_like(c)
+    prev_c[0] = np.nan
+    prev_c[1:] = c[:-1]
+    tr = np.maximum(h - l, np.maximum(np.abs(h - prev_c), np.abs(l - prev_c)))
+    atr_pct = _rolling_mean(tr, 14) * 100 / c
 
-def _generate_signals(df: pd.DataFrame, params: dict) -> pd.Series:
+    feats = _Features(bars, direction, _rolling_mean(bars.v, 30), atr_pct)
+    _feature_cache = (df, feats)
+    return feats
+
+
+def _generate_signals(feats: _Features, params: dict) -> np.ndarray:
     """確定足 2 本連続の方向シグナル (+ 出来高/ATR フィルタ)"""
     use_atr = params.get("USE_ATR_FILTER", 0)
     spike_ratio = params["SPIKE_RATIO"]
-    offset_pct = params["OFFSET_PCT"]
-
-    price_up = (df["close"] > df["open"]).astype(int)
-    price_dn = (df["close"] < df["open"]).astype(int) * -1
-    direction = price_up + price_dn
 
-    signal = (direction.shift(1) == direction) & (direction != 0)
+    signal = feats.direction != 0
 
     # volume spike
-    avg_vol = df["volume"].rolling(30).mean()
-    vol_ok = df["volume"] >= avg_vol * spike_ratio
+    vol_ok = feats.bars.v >= feats.avg_vol * spike_ratio
 
     filt = signal & vol_ok
 
     if use_atr:
-        # 簡易 ATR
-        tr = np.maximum(df["high"] - df["low"],
-                        np.abs(df["high"] - df["close"].shift(1)),
-                        np.abs(df["low"] - df["close"].shift(1)))
-        atr = pd.Series(tr).rolling(14).mean()
         atr_min = params["ATR_RATIO_MIN"]
         atr_max = params["ATR_RATIO_MAX"]
-        atr_ok = (atr >= atr_min * df["close"] / 100) & (atr <= atr_max * df["close"] / 100)
+        atr_ok = (feats.atr_pct >= atr_min) & (feats.atr_pct <= atr_max)
         filt &= atr_ok
 
-    return np.where(filt, direction, 0)
+    return np.where(filt, feats.direction, 0).astype(np.int64)
+
+
+@njit(cache=True)
+def _simulate_trades(close, high, low, sig, offset):
+    """
+    シグナル列に沿って 1 ポジションずつ TP / SL を判定し、各トレードの損益を返す。
+
+    バー毎の Python ループ（iterrows）を置き換えるネイティブカーネル。
+    cache=True でコンパイル結果をディスクに残し、再実行時の JIT を省く。
+    """
+    n = close.shape[0]
+    pnls = np.empty(n, dtype=np.float64)
+    k = 0
+
+    in_pos = False
+    entry_price = 0.0
+    entry_dir = 0
+    tp = 0.0
+    sl = 0.0
+
+    for i in range(n):
+        if not in_pos:
+            if sig[i] != 0:
+                # エントリー
+                entry_price = close[i]
+                entry_dir = sig[i]
+                tp = entry_price * (1 + offset * entry_dir)
+                sl = entry_price * (1 - offset * entry_dir)
+                in_pos = True
+            continue
+
+        # 決済判定
+        if entry_dir == 1:
+            if high[i] >= tp:
+                pnl = tp - entry_price
+            elif low[i] <= sl:
+                pnl = sl - entry_price
+            else:
+                continue
+        else:
+            if low[i] <= tp:
+                pnl = entry_price - tp
+            elif high[i] >= sl:
+                pnl = entry_price - sl
+            else:
+                continue
+
+        pnls[k] = pnl
+        k += 1
+        in_pos = False
+
+    return pnls[:k]
+
+
+def warmup() -> None:
+    """
+    小さなダミー DataFrame で run_backtest を 1 回通し、Numba カーネルの JIT（またはキャッシュ読込）を済ませる。
+
+    最初の trial の所要時間にコンパイルが混ざらないよう、最適化の開始前に呼ぶ。
+    Bars.from_frame の列は pandas の copy-on-write 下では読み取り専用になり、Numba は
+    書き込み可の配列とは別シグネチャでコンパイルするため、ダミー配列ではなく本番と同じ経路を通す。
+    """
+    global _feature_cache
+
+    n = 32
+    x = np.linspace(1.0, 2.0, n)
+    df = pd.DataFrame(
+        {"open": x, "high": x + 0.1, "low": x - 0.1, "close": x, "volume": np.ones(n)},
+        index=pd.date_range("2000-01-01", periods=n, freq="min"),
+    )
+    run_backtest(df, df, {"SPIKE_RATIO": 1.0, "USE_ATR_FILTER": 0, "OFFSET_PCT": 0.1})
+    _feature_cache = None   # ダミーの特徴量は保持しない
 
 
 def run_backtest(train_df: pd.DataFrame, test_df: pd.DataFrame, params: dict):
@@ -51,49 +193,18 @@ def run_backtest(train_df: pd.DataFrame, test_df: pd.DataFrame, params: dict):
     pf : float
     win_rate : float
     """
-    sig = _generate_signals(test_df, params)
+    feats = _features(test_df)
+    sig = _generate_signals(feats, params)
     offset = params["OFFSET_PCT"] / 100
-    entries = []
-    results = []
 
-    entry_price = None
-    entry_dir = 0
+    bars = feats.bars
+    results = _simulate_trades(bars.c, bars.h, bars.l, sig, offset)
 
-    for idx, row in test_df.iterrows():
-        s = sig[idx]
-        if entry_price is None and s != 0:
-            # エントリー
-            entry_price = row["close"]
-            entry_dir = s
-            tp = entry_price * (1 + offset * entry_dir)
-            sl = entry_price * (1 - offset * entry_dir)
-        elif entry_price is not None:
-            # 決済判定
-            if entry_dir == 1:
-                if row["high"] >= tp:
-                    pnl = tp - entry_price
-                elif row["low"] <= sl:
-                    pnl = sl - entry_price
-                else:
-                    continue
-            else:
-                if row["low"] <= tp:
-                    pnl = entry_price - tp
-                elif row["high"] >= sl:
-                    pnl = entry_price - sl
-                else:
-                    continue
-
-            entries.append(entry_price)
-            results.append(pnl)
-            entry_price = None
-            entry_dir = 0
-
-    if not results:
+    if results.size == 0:
         return 0, 0
 
-    gross_profit = sum(x for x in results if x > 0)
-    gross_loss = -sum(x for x in results if x < 0)
+    gross_profit = results[results > 0].sum()
+    gross_loss = -results[results < 0].sum()
     pf = gross_profit / gross_loss if gross_loss else float("inf")
-    win_rate = sum(1 for x in results if x > 0) / len(results)
+    win_rate = (results > 0).sum() / results.size
     return pf, win_rate
@@ -18,7 +18,7 @@ from pathlib import Path
 import optuna
 import pandas as pd
 
-from .backtest_engine import run_backtest
+from .backtest_engine import run_backtest, warmup
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
@@ -66,6 +66,9 @@ def main():
 
     df = pd.read_csv(args.csv, parse_dates=["datetime"], index_col="datetime")
 
+    # JIT を先に済ませ、trial ごとの計測をそろえる
+    warmup()
+
     best_params_all = []
 
     for idx, (train_df, test_df) in enumerate(
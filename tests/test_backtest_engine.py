@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+pytest -k backtest
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.research import backtest_engine
+from src.research.backtest_engine import run_backtest
+
+# 出来高 30 本平均が埋まるまでの横ばい足
+_FLAT = [(100.0, 100.0, 100.0, 100.0)] * 32
+
+# (open, high, low, close)
+_ROWS = _FLAT + [
+    (100.0, 101.0, 100.0, 101.0),   # 陽線
+    (101.0, 102.0, 101.0, 102.0),   # 陽線 2 本目 → LONG @102
+    (102.0, 104.0, 101.5, 103.5),   # 高値で TP
+    (103.5, 103.5, 103.5, 103.5),
+    (103.5, 103.5, 103.0, 103.0),   # 陰線
+    (103.0, 103.0, 102.5, 102.5),   # 陰線 2 本目 → SHORT @102.5
+    (102.5, 103.3, 102.4, 103.2),   # 高値で SL（OFFSET 0.5% のとき）
+    (103.2, 103.2, 103.2, 103.2),
+]
+
+
+def _frame(rows):
+    o, h, l, c = (np.array(col, dtype=np.float64) for col in zip(*rows))
+    return pd.DataFrame(
+        {"open": o, "high": h, "low": l, "close": c, "volume": np.ones(len(rows))},
+        index=pd.date_range("2024-01-01", periods=len(rows), freq="min"),
+    )
+
+
+@pytest.fixture(autouse=True)
+def _clear_feature_cache(monkeypatch):
+    monkeypatch.setattr(backtest_engine, "_feature_cache", None)
+
+
+def _params(offset_pct, spike_ratio=1.0):
+    return {"SPIKE_RATIO": spike_ratio, "USE_ATR_FILTER": 0, "OFFSET_PCT": offset_pct}
+
+
+def test_long_tp_then_short_sl():
+    df = _frame(_ROWS)
+    pf, win_rate = run_backtest(df, df, _params(0.5))
+
+    # LONG: 102 → TP 102.51 (+0.51) / SHORT: 102.5 → SL 103.0125 (-0.5125)
+    assert pf == pytest.approx(0.51 / 0.5125)
+    assert win_rate == 0.5
+
+
+def test_features_reused_across_params():
+    df = _frame(_ROWS)
+    run_backtest(df, df, _params(0.5))
+    feats = backtest_engine._feature_cache[1]
+
+    # 同じ df ならパラメータだけ変えても特徴量は再計算しない。
+    # OFFSET 1% だと SHORT の SL 103.525 に届かず、決済済みは LONG の TP (+1.02) だけ
+    assert run_backtest(df, df, _params(1.0)) == (float("inf"), 1.0)
+    assert backtest_engine._feature_cache[1] is feats
+
+    # 出来高スパイク条件を満たさなければ取引なし
+    assert run_backtest(df, df, _params(1.0, spike_ratio=2.0)) == (0, 0)
+    assert backtest_engine._feature_cache[1] is feats
@@ -33,3 +33,23 @@ def test_queue_exit_market(om):
     )
     # 内部マップに登録されたか
     assert dummy_entry in om._exit_map
+
+
+def test_on_fill_cancels_counterpart(om, monkeypatch):
+    cancelled = []
+    monkeypatch.setattr(om, "cancel_order", lambda oid: cancelled.append(oid) or True)
+
+    entry = "888888888888"
+    om._exit_map[entry] = {"tp_id": None, "sl_id": None}
+    om.on_exit_order_created(tp_id="tp-1", sl_id="sl-1", entry_order_id=entry)
+
+    # TP 約定 → SL をキャンセルし、マップから除去
+    om.on_fill("tp-1")
+    assert cancelled == ["sl-1"]
+    assert entry not in om._exit_map
+    assert "sl-1" not in om._sl_to_entry
+
+    # 既に処理済み / 未知の orderId は無視
+    om.on_fill("sl-1")
+    om.on_fill("unknown")
+    assert cancelled == ["sl-1"]
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+pytest -k stats
+"""
+
+import orjson
+
+import math
+
+from src.monitor import stats_tracker
+from src.monitor.stats_tracker import StatsTracker
+
+
+def test_rolling_counters_match_window(tmp_path, monkeypatch):
+    monkeypatch.setattr(stats_tracker, "STATS_FILE", tmp_path / "stats.ndjson")
+    monkeypatch.setattr(stats_tracker, "ROLLING_WINDOW_TRADES", 3)
+
+    st = StatsTracker()
+    pnls = [1.0, -2.0, 3.0, -4.0, 5.0]
+    for p in pnls:
+        st.add_trade(side="TP" if p > 0 else "SL", pnl=p)
+
+    # 窓 = 直近 3 件 [3, -4, 5]
+    assert st._wins == 2
+    assert st._gross_profit == 8.0
+    assert st._gross_loss == 4.0
+
+    # 追記ログには全件が残る
+    lines = (tmp_path / "stats.ndjson").read_bytes().splitlines()
+    assert [orjson.loads(l)["pnl"] for l in lines] == pnls
+
+
+def test_gross_loss_resets_when_losses_leave_window(tmp_path, monkeypatch):
+    monkeypatch.setattr(stats_tracker, "STATS_FILE", tmp_path / "stats.ndjson")
+    monkeypatch.setattr(stats_tracker, "ROLLING_WINDOW_TRADES", 3)
+
+    for order in ([-0.3, -0.2, -0.1], [-0.1, -0.2, -0.3]):
+        st = StatsTracker()
+        for p in order + [0.5, 0.5, 0.5]:
+            st.add_trade(side="TP" if p > 0 else "SL", pnl=p)
+
+        # 負けが窓から全て抜けたら浮動小数の残差なしで 0
+        assert st._losses == 0
+        assert st._gross_loss == 0.0
+        assert math.isclose(st._gross_profit, 1.5)
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+pytest -k strategy
+"""
+
+import numpy as np
+import pytest
+
+from src.core.strategy import WBARSimpleStrategy
+from src.core.strategy_kernels import evaluate_all, evaluate_array
+from src.data.bars import Bar, Bars
+
+
+def _bar(o, c):
+    return Bar(0, o, max(o, c), min(o, c), c, 1.0)
+
+
+@pytest.fixture()
+def strat():
+    return WBARSimpleStrategy(symbol="ETH_USDT", lot="0.01")
+
+
+def test_evaluate_two_bar_signal(strat):
+    assert strat.evaluate(_bar(1, 2)) is None
+    assert strat.evaluate(_bar(2, 3)) == "LONG"
+    assert strat.evaluate(_bar(3, 2)) is None
+    assert strat.evaluate(_bar(2, 1)) == "SHORT"
+    assert strat.evaluate(_bar(1, 1)) is None
+
+
+def test_evaluate_array_matches_evaluate(strat):
+    opens = np.array([1, 2, 3, 2, 1, 1, 2], dtype=np.float64)
+    closes = np.array([2, 3, 2, 1, 1, 2, 3], dtype=np.float64)
+
+    expected = []
+    for o, c in zip(opens, closes):
+        sig = strat.evaluate(_bar(o, c))
+        expected.append({"LONG": 1, "SHORT": -1, None: 0}[sig])
+
+    assert evaluate_array(opens, closes).tolist() == expected
+
+
+def test_evaluate_all_bars():
+    o = np.array([1, 2, 3, 2, 1], dtype=np.float64)
+    c = np.array([2, 3, 2, 1, 1], dtype=np.float64)
+    bars = Bars(np.arange(5, dtype=np.int64), o, np.maximum(o, c), np.minimum(o, c), c, np.ones(5))
+    sig = evaluate_all(bars)
+    assert sig.tolist() == [0, 1, 0, -1, 0]
@@ -38,7 +38,7 @@ EP_CANCEL = "/api/v1/private/order/cancel"
 
 # ───────── Helper ─────────
 def _md5(s: str) -> str:
-    return hashlib.md5(s.encode()).hexdigest()
+    return hashlib.md5(s.encode(), usedforsecurity=False).hexdigest()
 
 
 def _uid_sign(uid: str, payload) -> dict: